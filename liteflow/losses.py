@@ -24,7 +24,7 @@ class StreamingLoss(streaming.StreamingComputation):
       loss_collections: a list of string representing the keys of the collections
         to which the `Tensor` in `self.value` *AND* the tensor in `self.batch_value`
         must be added.
-      scope: the variable scope name to be used to build the portion of the graph.
+      scope: the name scope to be used to build the portion of the graph.
 
     The class implements also a __call__ interface accepting the very same arguments
     and returning:
@@ -108,11 +108,10 @@ class StreamingLoss(streaming.StreamingComputation):
           loss_collections: a list of string representing the keys of the collections
             to which the `Tensor` in `self.value` *AND* the tensor in `self.batch_value`
             must be added.
-          scope: the variable scope name to be used to build the portion of the graph.
+          scope: the name scope to be used to build the portion of the graph.
         """
 
-        # pylint: disable=I0011,E1129
-        with tf.variable_scope(scope or self.name) as scope:
+        with tf.name_scope(scope or self.name) as scope:
             values, weights = self._func(targets, predictions, weights)
             self._avg.compute(values, weights=weights, scope=scope)
 
@@ -132,7 +131,7 @@ class StreamingLoss(streaming.StreamingComputation):
           loss_collections: a list of string representing the keys of the collections
             to which the `Tensor` in `self.value` *AND* the tensor in `self.batch_value`
             must be added.
-          scope: the variable scope name to be used to build the portion of the graph.
+          scope: the name scope to be used to build the portion of the graph.
 
         Returns:
           value: a `Tensor` representing the streaming average value of the loss.
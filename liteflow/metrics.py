@@ -1,5 +1,8 @@
 """Streaming metrics implementation."""
 
+import weakref
+
+import numpy as np
 import tensorflow as tf
 
 from liteflow import ops
@@ -7,6 +10,39 @@ from liteflow import streaming
 from liteflow import utils
 
 
+_ARGMAX_CACHE = weakref.WeakValueDictionary()
+
+
+def _argmax_int32(predictions):
+    """Get the `tf.int32` argmax of the predictions over the last axis.
+
+    The returned tensor is memoized on the identity of `predictions`, so
+    that many metrics built on the same logits tensor (e.g. accuracy and
+    per-sentence accuracy) share a single argmax subgraph instead of
+    re-issuing one per metric under a different scope, where the common
+    subexpression elimination pass would miss it.
+    """
+    key = id(predictions)
+    argmax = _ARGMAX_CACHE.get(key)
+    if argmax is None:
+        argmax = tf.argmax(predictions, axis=-1, output_type=tf.int32)
+        _ARGMAX_CACHE[key] = argmax
+    return argmax
+
+
+def _jit_scope():
+    """Get an XLA JIT compilation scope.
+
+    Returns a context manager that marks the ops built within it for
+    XLA compilation, so that pointwise chains (equal, cast, multiply,
+    reduce) get fused into a single kernel instead of being dispatched
+    as separate ones.
+    """
+    # pylint: disable=I0011,E0611
+    from tensorflow.contrib.compiler import jit
+    return jit.experimental_jit_scope()
+
+
 class StreamingMetric(streaming.StreamingComputation):
     """Streaming metric base class.
 
@@ -26,7 +62,7 @@ class StreamingMetric(streaming.StreamingComputation):
         to which the `Tensor` in `self.value` must be added.
       updates_collections: a list of string representing the keys of the collections
         to which the `Op` in `self.update_op` must be added.,
-      scope: the variable scope name to be used to build the portion of the graph.
+      scope: the name scope to be used to build the portion of the graph.
 
     The class implements also a __call__ interface that accepts the same arguments
     as the `compute()` method and returns a pair of:
@@ -37,6 +73,11 @@ class StreamingMetric(streaming.StreamingComputation):
 
     This makes the class perfectly compliant to a standard function from `tf.metric`.
 
+    If the `jit_compile` flag is set in the constructor, the ops built by the
+    wrapped function are placed in an XLA JIT compilation scope so that the
+    pointwise op chain gets fused into a single kernel, sparing the per-op
+    dispatch overhead and the allocation of the intermediate tensors.
+
     Remarks:
       the `targets`, `predictions` and `weights` argument of both the `compute()` method
       and the `__call__` interface will be passed as-is to the wrapped function, so all
@@ -67,10 +108,13 @@ class StreamingMetric(streaming.StreamingComputation):
     ```
     """
 
-    def __init__(self, func, average=None, name=None):
+    def __init__(self, func, average=None, name=None, jit_compile=False):
         super(StreamingMetric, self).__init__(name=name)
         self._func = func
         self._avg = average or streaming.StreamingAverage()
+        self._jit_compile = jit_compile
+        self._collections_added = False
+        self._func_cache = {}
 
     @property
     def value(self):
@@ -126,18 +170,103 @@ class StreamingMetric(streaming.StreamingComputation):
             to which the `Tensor` in `self.value` must be added.
           updates_collections: a list of string representing the keys of the collections
             to which the `Op` in `self.update_op` must be added.,
-          scope: the variable scope name to be used to build the portion of the graph.
+          scope: the name scope to be used to build the portion of the graph.
         """
-        # pylint: disable=I0011,E1129
-        with tf.variable_scope(scope or self._name) as scope:
-            values, weights = self._func(targets, predictions, weights)
+        with tf.name_scope(scope or self._name) as scope:
+            values, weights = self._apply_func(targets, predictions, weights)
             self._avg.compute(values, weights, scope=scope)
 
+        self._add_to_collections(metrics_collections, updates_collections)
+
+    def compute_many(self, batches,
+                     metrics_collections=None,
+                     updates_collections=None,
+                     scope=None):
+        """Build the streaming metric over many batches at once.
+
+        Applies the wrapped function to each batch and accumulates all the
+        resulting values and weights into a single streaming average update,
+        so that sweeping a whole set of batches costs one `update_op` run
+        instead of one per batch.
+
+        Arguments:
+          batches: an iterable of `(targets, predictions, weights)` triples.
+            The `weights` entry can be `None`, but consistently across all
+            the batches; when set, it must have the same shape as `targets`
+            so that the flattened batches can be chained together.
+          metrics_collections: a list of string representing the keys of the
+            collections to which the `Tensor` in `self.value` must be added.
+          updates_collections: a list of string representing the keys of the
+            collections to which the `Op` in `self.update_op` must be added.
+          scope: the name scope to be used to build the portion of the graph.
+
+        Raises:
+          ValueError: if `batches` is empty or if `weights` is set only
+            for some of the batches.
+        """
+        with tf.name_scope(scope or self._name) as scope:
+            all_values = []
+            all_weights = []
+            for targets, predictions, weights in batches:
+                values, weights = self._apply_func(targets, predictions, weights)
+                all_values.append(tf.reshape(values, [-1]))
+                if weights is not None:
+                    weights = tf.reshape(weights, [-1])
+                all_weights.append(weights)
+            if not all_values:
+                raise ValueError('`batches` must yield at least one batch.')
+            values = tf.concat(all_values, axis=0)
+            weights = None
+            if any(w is not None for w in all_weights):
+                if any(w is None for w in all_weights):
+                    raise ValueError(
+                        '`weights` must be set for all the batches or for none.')
+                weights = tf.concat(all_weights, axis=0)
+            self._avg.compute(values, weights, scope=scope)
+
+        self._add_to_collections(metrics_collections, updates_collections)
+
+    def _add_to_collections(self, metrics_collections, updates_collections):
+        """Add the value and the update op to the collections, only once.
+
+        The insertion happens at most once per metric instance, so that
+        rebuilding the metric over new batches does not grow the collection
+        lists with duplicated entries.
+        """
+        if self._collections_added:
+            return
         if metrics_collections:
             utils.add_to_collections(metrics_collections, self.value)
-
         if updates_collections:
             utils.add_to_collections(updates_collections, self.update_op)
+        if metrics_collections or updates_collections:
+            self._collections_added = True
+
+    def _apply_func(self, targets, predictions, weights):
+        """Apply the wrapped function, within a JIT scope if so configured.
+
+        The outputs are memoized on the identity of the input tensors, so
+        that computing the metric again on the very same tensors reuses the
+        subgraph traced on the first call instead of building a duplicate.
+        Only graph tensors are memoized (with `None` weights as a valid key):
+        the cached outputs keep their graph -- and so the keyed tensors --
+        alive, while the id of a NumPy array or of a Python scalar can be
+        recycled after collection and would alias a stale entry.
+        """
+        key = None
+        if isinstance(targets, tf.Tensor) and isinstance(predictions, tf.Tensor) \
+                and (weights is None or isinstance(weights, tf.Tensor)):
+            key = (id(targets), id(predictions), id(weights))
+            if key in self._func_cache:
+                return self._func_cache[key]
+        if self._jit_compile:
+            with _jit_scope():
+                outputs = self._func(targets, predictions, weights)
+        else:
+            outputs = self._func(targets, predictions, weights)
+        if key is not None:
+            self._func_cache[key] = outputs
+        return outputs
 
     # pylint: disable=I0011,W0221
     def __call__(self, targets, predictions, weights=None,
@@ -154,7 +283,7 @@ class StreamingMetric(streaming.StreamingComputation):
             to which the `Tensor` in `self.value` must be added.
           updates_collections: a list of string representing the keys of the collections
             to which the `Op` in `self.update_op` must be added.,
-          scope: the variable scope (or its name) to be used to build the portion
+          scope: the name scope (a `str`) to be used to build the portion
             of the graph.
 
         Returns:
@@ -168,7 +297,85 @@ class StreamingMetric(streaming.StreamingComputation):
         return self.value, self.update_op
 
 
-def accuracy(targets, predictions, weights=None):
+def _accuracy_np(targets, predictions, weights, dtype, aggregate):
+    """NumPy fast path for `accuracy` on eagerly evaluated arrays.
+
+    Mirrors the graph-building path of `accuracy` without going through
+    the TF kernel dispatch, whose overhead dominates on the small arrays
+    typically seen in tests and eager evaluation loops. Tie handling on
+    float32 logits follows `tf.nn.in_top_k`, like the graph path does: a
+    target whose logit ties with the maximum counts as correct.
+    """
+    dtype = dtype.as_numpy_dtype
+    if predictions.ndim > targets.ndim:
+        if predictions.ndim - targets.ndim > 1:
+            raise ValueError(
+                """Rank of `predictions` must be equal to rank of `label` """
+                """or greater of 1, found %d and %d instead."""
+                % (predictions.ndim, targets.ndim))
+        if predictions.dtype == np.float32:
+            picked = np.take_along_axis(
+                predictions, np.expand_dims(targets, axis=-1), axis=-1)
+            is_equal = picked[..., 0] >= predictions.max(axis=-1)
+        else:
+            is_equal = np.equal(targets, np.argmax(predictions, axis=-1))
+    else:
+        is_equal = np.equal(targets, predictions)
+    if weights is None:
+        values = is_equal.astype(dtype)
+        if aggregate:
+            return values.sum(dtype=np.float32), np.float32(values.size)
+        return values, None
+    weights = np.asarray(weights)
+    values = np.where(
+        is_equal, np.broadcast_to(weights, targets.shape), 0).astype(dtype)
+    if aggregate:
+        return (values.sum(dtype=np.float32),
+                np.broadcast_to(weights, targets.shape).sum(dtype=np.float32))
+    return values, weights
+
+
+def _is_equal(targets, predictions):
+    """Build the boolean correctness tensor of targets vs. predictions.
+
+    The result is kept as a 1-byte `tf.bool` tensor of the same shape as
+    `targets`, so that consumers combining it logically (like the per-sentence
+    accuracy) never materialize a 4-byte float intermediate.
+
+    Raises:
+      ValueError: if the rank of `targets` or `predictions` is not statically
+        known, or if the rank of `predictions` is greater than the rank of
+        `targets` of more than 1.
+    """
+    trank = targets.get_shape().ndims
+    prank = predictions.get_shape().ndims
+    if trank is None or prank is None:
+        raise ValueError(
+            """The rank of both `targets` and `predictions` must be """
+            """statically known, found %s and %s instead."""
+            % (str(trank), str(prank)))
+    if prank > trank:
+        diff = prank - trank
+        if diff > 1:
+            raise ValueError(
+                """Rank of `predictions` must be equal to rank of `label` """
+                """or greater of 1, found %d and %d instead.""" % (prank, trank))
+        if predictions.dtype == tf.float32:
+            num_classes = tf.shape(predictions)[-1]
+            is_equal = tf.nn.in_top_k(
+                tf.reshape(predictions, tf.stack([-1, num_classes])),
+                tf.reshape(targets, [-1]), 1)
+            is_equal = tf.reshape(is_equal, tf.shape(targets))
+            is_equal.set_shape(targets.get_shape())
+        else:
+            is_equal = tf.equal(targets, _argmax_int32(predictions))
+    else:
+        is_equal = tf.equal(targets, predictions)
+    return is_equal
+
+
+def accuracy(targets, predictions, weights=None, dtype=tf.float32,
+             aggregate=False):
     """Computes the categorical accuracy.
 
     Given a set of ground truth values and a set of predicted labels as tensors of
@@ -188,30 +395,123 @@ def accuracy(targets, predictions, weights=None):
         last dimension. Alternatively it can be of the same shape, `dtype` and format of
         `target`, and it will considered as the predicted labels.
       weights: coefficients for the metric. This must be scalar or of same rank as `target`.
+      dtype: the `tf.DType` of the output values, default `tf.float32`. A
+        reduced precision type like `tf.float16` or `tf.bfloat16` halves the
+        bandwidth of the pointwise kernel and loses nothing on the 0/weight
+        values, as long as the downstream accumulation stays in `tf.float32`
+        (as the one of `liteflow.streaming.StreamingAverage` does).
+      aggregate: if `True`, return the pre-reduced `(numerator, denominator)`
+        scalar pair instead of the full-size values and weights tensors, so
+        that a streaming consumer only has to accumulate two scalars per
+        batch; the reductions are built right after the pointwise chain and
+        fuse with it. The pair is always `tf.float32`, whatever the `dtype`
+        of the values, so the whole-batch sums never run in reduced
+        precision. Note that with non-0/1 weights the ratio of the pair,
+        `sum(w * hit) / sum(w)`, intentionally differs from feeding the
+        tensor pair to `liteflow.streaming.StreamingAverage`, which
+        multiplies the already-weighted values by the weights again and
+        yields `sum(w^2 * hit) / sum(w)`.
 
     Returns:
-      values: a `Tensor` of `dtype=tf.float32` and of the same shape as `targest`
-        representing the accuracy, weighted according to the input argument `weights`.
-      weights: a `Tensor` of `dtype=tf.float32` and of the same shape of `values`
-        representing the weighted scheme for the streaming average on `values`, which
-        is the same tensor of the input `weights` argument.
+      values: a `Tensor` of the requested `dtype` and of the same shape as
+        `targets` representing the accuracy, weighted according to the input
+        argument `weights`.
+      weights: a `Tensor` of the same shape of `values` representing the
+        weighted scheme for the streaming average on `values`, which is the
+        same tensor of the input `weights` argument.
+      If `aggregate` is set, the pair is instead the scalar sum of the
+      weighted values and the scalar sum of the weights (or the number of
+      elements, if `weights` is `None`), both as `tf.float32` scalars.
+
+    Raises:
+      ValueError: if the rank of `targets` or `predictions` is not statically
+        known, or if the rank of `predictions` is greater than the rank of
+        `targets` of more than 1. The ranks are checked at graph building time
+        so that only the needed branch gets its ops into the graph.
+
+    Remarks:
+      if `targets` and `predictions` are `np.ndarray` instances (and `weights`
+      is a `np.ndarray`, a scalar or `None`), the metric is computed eagerly
+      in NumPy and `np.ndarray`s are returned, skipping the TF graph entirely.
+      If `weights` is the Python scalar `1.0`, it is folded away at graph
+      building time exactly as if it were `None`, since it would weight
+      nothing; in such case the returned weights are `None`.
+      When `predictions` are `tf.float32` logits with the extra class axis,
+      the correctness is computed with `tf.nn.in_top_k(k=1)`, so a target
+      whose logit ties with the maximum counts as correct; the NumPy fast
+      path follows the same convention.
     """
-    trank = targets.get_shape().ndims
-    prank = predictions.get_shape().ndims
-    if prank > trank:
-        diff = prank - trank
-        if diff > 1:
-            raise ValueError(
-                """Rank of `predictions` must be equal to rank of `label` """
-                """or greater of 1, found %d and %d instead.""" % (prank, trank))
-        predictions = tf.argmax(predictions, axis=-1)  # tf.int64!!!
-        predictions = tf.cast(predictions, tf.int32)
+    if isinstance(weights, (int, float)) and float(weights) == 1.0:
+        weights = None
 
-    is_equal = tf.equal(targets, predictions)
-    is_equal = tf.cast(is_equal, tf.float32)
-    if weights is not None:
-        is_equal = tf.multiply(is_equal, weights)
-    return is_equal, weights
+    if isinstance(targets, np.ndarray) and isinstance(predictions, np.ndarray) \
+            and (weights is None
+                 or isinstance(weights, (np.ndarray, int, float))):
+        return _accuracy_np(targets, predictions, weights, dtype, aggregate)
+
+    if predictions.device:
+        with tf.device(predictions.device):
+            return _accuracy_graph(targets, predictions, weights, dtype, aggregate)
+    return _accuracy_graph(targets, predictions, weights, dtype, aggregate)
+
+
+def _accuracy_graph(targets, predictions, weights, dtype, aggregate):
+    """Build the graph portion of `accuracy`.
+
+    Kept separate so that `accuracy` can pin the whole pointwise chain on
+    the device holding the predictions: under the default placer the ops
+    downstream of the argmax could land on a different device, paying a
+    send/recv pair for every intermediate tensor.
+    """
+    is_equal = _is_equal(targets, predictions)
+
+    if weights is None:
+        values = tf.cast(is_equal, dtype)
+        if aggregate:
+            return (tf.reduce_sum(tf.to_float(tf.reshape(values, [-1]))),
+                    tf.to_float(tf.size(values)))
+        return values, None
+
+    weights = tf.convert_to_tensor(weights)
+    wvalues = weights
+    if not (weights.get_shape().is_fully_defined()
+            and weights.get_shape() == targets.get_shape()):
+        wvalues = tf.broadcast_to(weights, tf.shape(targets))
+    if wvalues.dtype != dtype:
+        wvalues = tf.cast(wvalues, dtype)
+    values = tf.where(is_equal, wvalues, tf.zeros_like(wvalues))
+    if aggregate:
+        return (tf.reduce_sum(tf.to_float(tf.reshape(values, [-1]))),
+                tf.reduce_sum(tf.to_float(tf.reshape(wvalues, [-1]))))
+    return values, weights
+
+
+def accuracy_update(state, targets, predictions, weights=None):
+    """Pure-functional streaming update of the categorical accuracy.
+
+    Stateless counterpart of a `StreamingMetric` built on `accuracy`: instead
+    of updating local variables, it takes the running `(total, count)` pair
+    and returns the updated one. This form can drive a `tf.scan` or a
+    `tf.data.Dataset.reduce`, keeping the whole streaming loop inside one
+    graph execution with no read-modify-write barrier between batches.
+
+    Arguments:
+      state: a `(total, count)` pair of `tf.float32` scalar tensors, as
+        returned by a previous invocation (or zeros for an empty stream).
+      targets: a `Tensor` representing the gold truth values, see `accuracy`.
+      predictions: a `Tensor` representing the predicted values, see `accuracy`.
+      weights: optional coefficients for the metric, see `accuracy`.
+
+    Returns:
+      a `(total, count)` pair of `tf.float32` scalar tensors, where `total`
+      accumulates the weighted correct predictions and `count` the weights
+      (or the number of elements, if `weights` is `None`); their ratio is
+      the streaming accuracy seen so far.
+    """
+    total, count = state
+    batch_total, batch_count = accuracy(
+        targets, predictions, weights, aggregate=True)
+    return total + batch_total, count + batch_count
 
 
 def per_sentence_accuracy(targets, predictions, weights=None):
@@ -243,8 +543,7 @@ def per_sentence_accuracy(targets, predictions, weights=None):
         representing the weighted scheme for the streaming average on `values`, which
         is the same tensor of the input `weights` argument.
     """
-    values, weights = accuracy(targets, predictions, weights)
-    values = tf.cast(values, tf.bool)
+    values = _is_equal(targets, predictions)
     if weights is not None:
         weights = tf.cast(weights, tf.bool)
         values = ops.logical_impl(weights, values)
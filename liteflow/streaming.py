@@ -105,7 +105,7 @@ class StreamingAverage(StreamingComputation):
         and must be broadcastable to values (i.e., all dimensions must be either `1`, or
         the same as the corresponding values dimension). It contains the weights for summing
         up all the elements in `values`.
-      `scope`: a `str`  or a `tf.VariableScope` used for building the fragment
+      `scope`: a `str` used as the name scope for building the fragment
         of the computational graph that computes the streaming average.
 
     and retuns a pair of:
@@ -173,21 +173,30 @@ class StreamingAverage(StreamingComputation):
             as values, and must be broadcastable to values (i.e., all dimensions must
             be either `1`, or the same as the corresponding values dimension). It contains
             the weights for summing up all the elements in `values`.
-          scope: a `str`  or a `tf.VariableScope` used for building the fragment
+          scope: a `str` used as the name scope for building the fragment
             of the computational graph that computes the streaming average.
+
+        Remarks:
+          the running totals are always accumulated in `tf.float32`: values
+          and weights of a different dtype (e.g. `tf.float16` coming from a
+          reduced-precision metric) are cast at this boundary, so the
+          accumulation keeps full precision.
         """
-        # pylint: disable=I0011,E1129
-        with tf.variable_scope(scope or self._name) as scope:
+        with tf.name_scope(scope or self._name):
             self._count = _local_variable('count')
             self._total = _local_variable('total')
 
+            values = tf.cast(values, tf.float32)
             if weights is not None:
-                values = tf.multiply(values, weights)
-                self._batch_count = tf.reduce_sum(weights, name='batch_count')
+                weights = tf.cast(weights, tf.float32)
+                values = tf.math.multiply_no_nan(values, weights)
+                self._batch_count = tf.reduce_sum(
+                    tf.reshape(weights, [-1]), name='batch_count')
             else:
                 self._batch_count = tf.to_float(tf.size(values), name='batch_count')
 
-            self._batch_total = tf.reduce_sum(values, name='batch_total')
+            self._batch_total = tf.reduce_sum(
+                tf.reshape(values, [-1]), name='batch_total')
             self._batch_value = ops.safe_div(
                 self._batch_total, self._batch_count, name='batch_value')
 
@@ -217,7 +226,7 @@ class StreamingAverage(StreamingComputation):
             as values, and must be broadcastable to values (i.e., all dimensions must
             be either `1`, or the same as the corresponding values dimension). It contains
             the weights for summing up all the elements in `values`.
-          scope: a `str`  or a `tf.VariableScope` used for building the fragment
+          scope: a `str` used as the name scope for building the fragment
             of the computational graph that computes the streaming average.
 
         Returns:
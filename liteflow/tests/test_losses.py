@@ -40,7 +40,7 @@ class TestStreamingLoss(tf.test.TestCase):
         self.assertIn('weights', kwargs)
         self.assertEqual(kwargs.pop('weights'), weights_out)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
     def test_weights_in_none(self):
         """Test case with no weights passed to the wrapped function."""
@@ -67,7 +67,7 @@ class TestStreamingLoss(tf.test.TestCase):
         self.assertIn('weights', kwargs)
         self.assertEqual(kwargs.pop('weights'), weights_out)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
 
     def test_weights_out_none(self):
@@ -95,7 +95,7 @@ class TestStreamingLoss(tf.test.TestCase):
         self.assertIn('weights', kwargs)
         self.assertEqual(kwargs.pop('weights'), None)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
     def test_weights_in_out_none(self):
         """Test case with no weights at all."""
@@ -121,7 +121,29 @@ class TestStreamingLoss(tf.test.TestCase):
         self.assertIn('weights', kwargs)
         self.assertEqual(kwargs.pop('weights'), None)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
+
+
+    def test_with_real_average(self):
+        """Test case running through the real streaming average."""
+        scope = 'StreamingLossScope'
+        targets = tf.constant([[0, 1, 2], [0, 9, 23]], dtype=tf.int32)
+        predictions = tf.constant([[0, 1, 2], [0, 9, 23]], dtype=tf.int32)
+        weights = tf.constant([[1, 1, 1], [1, 1, 0]], dtype=tf.float32)
+        values = tf.constant([[1, 2, 3], [4, 5, 1000]], dtype=tf.float32)
+
+        func = mock.Mock()
+        func.side_effect = [(values, weights)]
+
+        loss = losses.StreamingLoss(func, streaming.StreamingAverage())
+        loss.compute(targets, predictions, weights, scope=scope)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            sess.run(tf.local_variables_initializer())
+            sess.run(loss.update_op)
+            self.assertEqual(3.0, sess.run(loss.value))
+            self.assertEqual(5.0, sess.run(loss.count))
 
 
 class TestCategoricalCrossentropy(tf.test.TestCase):
@@ -37,7 +37,7 @@ class TestStreamingMetric(tf.test.TestCase):
         self.assertEqual(act_values, values)
         self.assertEqual(act_weights_out, weights_out)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
 
     def test_weights_in_none(self):
@@ -64,7 +64,7 @@ class TestStreamingMetric(tf.test.TestCase):
         self.assertEqual(act_values, values)
         self.assertEqual(act_weights_out, weights_out)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
 
     def test_weights_out_none(self):
@@ -91,7 +91,7 @@ class TestStreamingMetric(tf.test.TestCase):
         self.assertEqual(act_values, values)
         self.assertEqual(act_weights_out, None)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
 
 
     def test_weights_in_out_none(self):
@@ -117,7 +117,65 @@ class TestStreamingMetric(tf.test.TestCase):
         self.assertEqual(act_values, values)
         self.assertEqual(act_weights_out, None)
         self.assertIn('scope', kwargs)
-        self.assertEqual(kwargs.pop('scope').name, scope)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
+
+
+    def test_compute_many(self):
+        """Test case for many batches accumulated in one update."""
+        scope = 'MyScope'
+        targets_01 = tf.constant([[0, 1, 2]], dtype=tf.int32)
+        predictions_01 = tf.constant([[0, 1, 2]], dtype=tf.int32)
+        weights_01 = tf.constant([[1, 1, 1]], dtype=tf.float32)
+        targets_02 = tf.constant([[0, 9, 23]], dtype=tf.int32)
+        predictions_02 = tf.constant([[0, 9, 23]], dtype=tf.int32)
+        weights_02 = tf.constant([[0, 0, 1]], dtype=tf.float32)
+        values_01 = tf.constant([[5, 6, 7]], dtype=tf.float32)
+        values_02 = tf.constant([[8, 9, 10]], dtype=tf.float32)
+
+        func = mock.Mock()
+        func.side_effect = [(values_01, weights_01), (values_02, weights_02)]
+
+        avg = streaming.StreamingAverage()
+        avg.compute = mock.MagicMock()
+
+        metric = metrics.StreamingMetric(func, avg)
+        metric.compute_many(
+            [(targets_01, predictions_01, weights_01),
+             (targets_02, predictions_02, weights_02)],
+            scope=scope)
+
+        self.assertEqual(2, func.call_count)
+        avg.compute.assert_called_once()
+        args, kwargs = avg.compute.call_args
+        act_values, act_weights = args
+        self.assertEqual([6], act_values.get_shape().as_list())
+        self.assertEqual([6], act_weights.get_shape().as_list())
+        self.assertIn('scope', kwargs)
+        self.assertEqual(kwargs.pop('scope'), scope + '/')
+
+    def test_jit_compile(self):
+        """Test case with the XLA JIT compilation scope enabled."""
+        scope = 'MyScope'
+        targets = tf.constant([[0, 1, 2], [0, 9, 23]], dtype=tf.int32)
+        predictions = tf.constant([[0, 1, 2], [0, 9, 23]], dtype=tf.int32)
+        values = tf.constant([5, 6, 7], dtype=tf.float32)
+        weights_out = tf.constant([1, 0, 1], dtype=tf.float32)
+
+        func = mock.Mock()
+        func.side_effect = [(values, weights_out)]
+
+        avg = streaming.StreamingAverage()
+        avg.compute = mock.MagicMock()
+
+        jit_scope = mock.MagicMock()
+        with mock.patch.object(metrics, '_jit_scope', return_value=jit_scope) as jit:
+            metric = metrics.StreamingMetric(func, avg, jit_compile=True)
+            metric.compute(targets, predictions, scope=scope)
+
+        jit.assert_called_once()
+        jit_scope.__enter__.assert_called_once()
+        func.assert_called_once_with(targets, predictions, None)
+        avg.compute.assert_called_once()
 
 
 class TestAccuracy(tf.test.TestCase):
@@ -169,6 +227,132 @@ class TestAccuracy(tf.test.TestCase):
         self.assertAllEqual(exp_accuracy, act_accuracy)
 
 
+    def test_aggregate(self):
+        """Test case with pre-reduced scalar outputs."""
+        targets = tf.constant([[2, 1, 0, 0]], dtype=tf.int32)
+        predictions = tf.constant([[2, 1, 1, 1]], dtype=tf.int32)
+        weights = tf.constant([[1, 1, 0, 0]], dtype=tf.float32)
+
+        total_t, count_t = metrics.accuracy(
+            targets, predictions, weights, aggregate=True)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            act_total, act_count = sess.run([total_t, count_t])
+
+        self.assertEqual(2.0, act_total)
+        self.assertEqual(2.0, act_count)
+
+    def test_aggregate_dtype(self):
+        """Test case with pre-reduced outputs and reduced precision values."""
+        targets = tf.constant([[2, 1, 0, 0]], dtype=tf.int32)
+        predictions = tf.constant([[2, 1, 1, 1]], dtype=tf.int32)
+        weights = tf.constant([[1, 1, 0, 0]], dtype=tf.float32)
+
+        total_t, count_t = metrics.accuracy(
+            targets, predictions, weights, dtype=tf.float16, aggregate=True)
+        self.assertEqual(tf.float32, total_t.dtype)
+        self.assertEqual(tf.float32, count_t.dtype)
+
+        state = (tf.constant(0.0), tf.constant(0.0))
+        state = (state[0] + total_t, state[1] + count_t)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            act_total, act_count = sess.run(state)
+
+        self.assertEqual(2.0, act_total)
+        self.assertEqual(2.0, act_count)
+
+    def test_dtype(self):
+        """Test case streaming reduced precision values through the average."""
+        targets = tf.constant([[2, 1, 0, 0]], dtype=tf.int32)
+        predictions = tf.constant([[2, 1, 1, 1]], dtype=tf.int32)
+        weights = tf.constant([[1, 1, 0, 0]], dtype=tf.float32)
+
+        accuracy_t, weights_t = metrics.accuracy(
+            targets, predictions, weights, dtype=tf.float16)
+        self.assertEqual(tf.float16, accuracy_t.dtype)
+        self.assertEqual(tf.float32, weights_t.dtype)
+
+        avg = streaming.StreamingAverage()
+        avg.compute(accuracy_t, weights_t)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            sess.run(tf.local_variables_initializer())
+            sess.run(avg.update_op)
+            self.assertEqual(1.0, sess.run(avg.value))
+            self.assertEqual(2.0, sess.run(avg.count))
+
+    def test_tied_logits(self):
+        """Test that targets tied with the max logit count as correct on both paths."""
+        targets = np.asarray([[0, 2]], dtype=np.int32)  # pylint: disable=I0011,E1101
+        predictions = np.asarray(
+            [[[0.5, 0.5, 0.1],  # tie between 0 and 1: target 0, CORRECT.
+              [0.5, 0.5, 0.1]]],  # target 2 below the max: WRONG.
+            dtype=np.float32)  # pylint: disable=I0011,E1101
+        exp_accuracy = np.asarray([[1, 0]], dtype=np.float32)  # pylint: disable=I0011,E1101
+
+        act_accuracy, _ = metrics.accuracy(targets, predictions)
+        self.assertAllEqual(exp_accuracy, act_accuracy)
+
+        accuracy_t, _ = metrics.accuracy(
+            tf.constant(targets), tf.constant(predictions))
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            self.assertAllEqual(exp_accuracy, sess.run(accuracy_t))
+
+    def test_numpy_fast_path(self):
+        """Test case with eagerly evaluated NumPy inputs."""
+        targets = np.asarray([[2, 1, 0, 0]], dtype=np.int32)  # pylint: disable=I0011,E1101
+        predictions = np.asarray(
+            [[[0.1, 0.8, 0.1],  # predicted: 1, WRONG.
+              [0.1, 0.8, 0.1],  # predicted: 1, CORRECT.
+              [0.8, 0.1, 0.1],  # predicted: 0, CORRECT
+              [0.1, 0.1, 0.8]]],  # predicted: 2, WRONG.
+            dtype=np.float32)  # pylint: disable=I0011,E1101
+        weights = np.asarray([[1, 1, 0, 0]], dtype=np.float32)  # pylint: disable=I0011,E1101
+
+        act_accuracy, act_weights = metrics.accuracy(targets, predictions, weights)
+        exp_accuracy = np.asarray([[0, 1, 0, 0]], dtype=np.float32)  # pylint: disable=I0011,E1101
+
+        self.assertIsInstance(act_accuracy, np.ndarray)
+        self.assertAllEqual(exp_accuracy, act_accuracy)
+        self.assertAllEqual(weights, act_weights)
+
+    def test_shared_argmax(self):
+        """Test that metrics built on the same logits share the argmax subgraph."""
+        predictions = tf.constant(
+            [[[0.1, 0.8, 0.1],
+              [0.8, 0.1, 0.1]]],
+            dtype=tf.float32)
+        first = metrics._argmax_int32(predictions)  # pylint: disable=I0011,W0212
+        second = metrics._argmax_int32(predictions)  # pylint: disable=I0011,W0212
+        self.assertIs(first, second)
+
+
+class TestAccuracyUpdate(tf.test.TestCase):
+    """Test class for the liteflow.metrics.accuracy_update function."""
+
+    def test_default(self):
+        """Default test case."""
+        targets = tf.constant([[1, 2, 3], [0, 9, 23]], dtype=tf.int32)
+        predictions = tf.constant([[1, 2, 4], [9, 0, 23]], dtype=tf.int32)
+        weights = tf.constant([[1, 1, 1], [0, 0, 1]], dtype=tf.float32)
+
+        state = (tf.constant(0.0), tf.constant(0.0))
+        state = metrics.accuracy_update(state, targets, predictions, weights)
+        state = metrics.accuracy_update(state, targets, predictions)
+
+        with tf.Session() as sess:
+            sess.run(tf.global_variables_initializer())
+            act_total, act_count = sess.run(state)
+
+        self.assertEqual(6.0, act_total)  # 3 weighted + 3 unweighted hits.
+        self.assertEqual(10.0, act_count)  # 4 weights + 6 elements.
+
+
 class TestPerSentenceAccuracy(tf.test.TestCase):
     """Test class for the liteflow.metrics.per_sentence_accuracy function."""
 